@@ -1,11 +1,13 @@
 import argparse
+import concurrent.futures
 import dataclasses
-from re import I
+import functools
 import gooey
-import itertools
+import operator
 import os
 import sys
-from typing import Iterable
+import tempfile
+from typing import Iterable, Sequence
 
 import ffmpeg_2pass_tools.third_party as _
 from MotionPhoto2 import Muxer as muxer_lib
@@ -37,7 +39,8 @@ def normal_main() -> int:
   if not bursts or not stills:
     print('Error: No files found from bursts or stills.')
     return 2
-  if intersection := set(bursts) & set(stills):
+  stills_set = set(stills)
+  if intersection := [b for b in bursts if b in stills_set]:
     print('Error: Some files are in both bursts and stills:', intersection)
     return 2
   highlight.print(
@@ -55,8 +58,7 @@ def normal_main() -> int:
 
   # Make videos
   execcmd = highlight.ExecCmd(dry_run=args.dry_run)
-  for series in burst_series:
-    series.make_video(args.ffargs, execcmd=execcmd)
+  make_videos(burst_series, list(args.ffargs), execcmd=execcmd)
 
   # Attach videos to stills
   attach_videos_to_stills(burst_series, still_images, dry_run=args.dry_run)
@@ -137,21 +139,44 @@ def parse_args() -> Args:
   return args
 
 
+_IMAGE_EXTS = frozenset(
+    {'.jpg', '.jpeg', '.png', '.heic', '.heif', '.tif', '.tiff'})
+
+
 def scan_for_image_files(paths: Iterable[str]) -> list[str]:
-  image_exts = ('.jpg', '.jpeg', '.png', '.heic', '.heif', '.tif', '.tiff')
-  files = []
+  files: list[str] = []
+  seen: set[str] = set()
+  scanned_dirs: set[str] = set()
+
+  def add(file: str) -> None:
+    # Overlapping paths (e.g. a directory and a file in it) are added once.
+    key = os.path.abspath(file)
+    if key not in seen:
+      seen.add(key)
+      files.append(file)
+
   for path in paths:
     if os.path.isdir(path):
-      for file in os.listdir(path):
-        if file.lower().endswith(image_exts):
-          files.append(os.path.join(path, file))
+      abs_path = os.path.abspath(path)
+      if abs_path in scanned_dirs:
+        continue
+      scanned_dirs.add(abs_path)
+      with os.scandir(path) as entries:
+        for e in entries:
+          if _has_image_ext(e.name) and e.is_file():
+            add(e.path)
     elif os.path.isfile(path):
-      files.append(path)
+      add(path)
     else:
       highlight.warn(f'Invalid path: {path} . Does the file/directory exist?')
   return files
 
 
+def _has_image_ext(name: str) -> bool:
+  # Lowercase only the extension rather than the whole file name.
+  return name[name.rfind('.'):].lower() in _IMAGE_EXTS
+
+
 @dataclasses.dataclass
 class BurstSeries:
   """A series of burst shots.
@@ -172,6 +197,11 @@ class BurstSeries:
     assert self.images
     return self.images[0].path_pattern
 
+  @functools.cached_property
+  def paths(self) -> list[str]:
+    """The image paths. Only valid once `images` is complete."""
+    return [img.path for img in self.images]
+
   @property
   def first_seq(self) -> int:
     assert self.images
@@ -190,33 +220,89 @@ class BurstSeries:
     Only series with `min_num_images` or more images will be returned.
     """
     all_series: list[BurstSeries] = []
-    images_by_pattern = itertools.groupby(images, key=lambda x: x.path_pattern)
-
-    for unused_pattern, image_iter in images_by_pattern:
-      images = sorted(image_iter, key=lambda x: x.sequence_num)
-      for i, img in enumerate(images):
-        if (i == 0 or img.sequence_num != images[i - 1].sequence_num + 1 or
-            img.time - images[i - 1].time > 1.0):
-          all_series.append(BurstSeries([img]))
+    # Bucket by pattern so that the input order doesn't matter.
+    images_by_pattern: dict[str, list[image_file.ImageFile]] = {}
+    for img in images:
+      images_by_pattern.setdefault(img.path_pattern, []).append(img)
+    for images in images_by_pattern.values():
+      images.sort(key=operator.attrgetter('sequence_num'))
+
+    # Only images next to a consecutive sequence number need their time, so
+    # fetch just those, all in one exiftool run.
+    need_time: dict[image_file.ImageFile, None] = {}
+    for images in images_by_pattern.values():
+      for prev, img in zip(images, images[1:]):
+        if img.sequence_num == prev.sequence_num + 1:
+          need_time[prev] = need_time[img] = None
+    image_file.ImageFile.prefetch_times(need_time)
+
+    # Series shorter than `min_num_images` are dropped as soon as they end.
+    def end_series(series_images: list[image_file.ImageFile]) -> None:
+      if series_images and len(series_images) >= min_num_images:
+        all_series.append(BurstSeries(series_images))
+
+    for images in images_by_pattern.values():
+      current: list[image_file.ImageFile] = []
+      for img in images:
+        if (current and img.sequence_num == current[-1].sequence_num + 1 and
+            img.time - current[-1].time <= 1.0):
+          current.append(img)
         else:
-          all_series[-1].images.append(img)
+          end_series(current)
+          current = [img]
+      end_series(current)
 
-    return [s for s in all_series if len(s.images) >= min_num_images]
+    return all_series
 
-  def make_video(self, ffmpeg_args: Iterable[str],
-                 execcmd: highlight.ExecCmd) -> None:
+  def make_video(self,
+                 ffmpeg_args: list[str],
+                 execcmd: highlight.ExecCmd,
+                 passlogfile: str | None = None) -> None:
     """Converts the images in this burst series to a video."""
     highlight.print(f'\nConverting {self.path_pattern} '
                     f'({len(self.images)} images) to a video...')
     input_flags_and_settings = get_ffmpeg_input_flags.get_ffmpeg_input_flags(
-        [img.path for img in self.images])
-    all_flags = input_flags_and_settings.flags + list(ffmpeg_args)
-    result = ffmpeg_2pass_and_exif.ffmpeg_2pass_and_exif(all_flags,
-                                                         execcmd=execcmd)
+        self.paths)
+    all_flags = input_flags_and_settings.flags + ffmpeg_args
+    result = ffmpeg_2pass_and_exif.ffmpeg_2pass_and_exif(
+        all_flags, execcmd=execcmd, passlogfile=passlogfile)
     self.video = result.output_path
     self.video_input_settings = input_flags_and_settings.settings
 
 
+def make_videos(burst_series: Sequence[BurstSeries], ffmpeg_args: list[str],
+                execcmd: highlight.ExecCmd) -> None:
+  """Converts all burst series to videos.
+
+  A single encode rarely uses more than ~8 cores, so on larger machines several
+  series are encoded at the same time, each with its own 2-pass log file.
+  """
+  max_workers = 1 if execcmd.dry_run else max(1, (os.cpu_count() or 1) // 8)
+  if max_workers == 1:
+    for series in burst_series:
+      series.make_video(ffmpeg_args, execcmd)
+    return
+
+  with tempfile.TemporaryDirectory(
+      prefix='burst_shots_into_live_photo.') as passlog_dir:
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+      futures = [
+          executor.submit(series.make_video, ffmpeg_args, execcmd,
+                          os.path.join(passlog_dir, f'series{i}'))
+          for i, series in enumerate(burst_series)
+      ]
+      try:
+        done, _ = concurrent.futures.wait(
+            futures, return_when=concurrent.futures.FIRST_EXCEPTION)
+        for future in done:
+          future.result()
+      except BaseException:
+        # Stop at the first failure or Ctrl-C, as the sequential loop does.
+        # Encodes already running are still waited for.
+        executor.shutdown(cancel_futures=True)
+        raise
+
+
 def attach_videos_to_stills(burst_series: Iterable[BurstSeries],
                             stills: Iterable[image_file.ImageFile],
                             dry_run=False) -> None:
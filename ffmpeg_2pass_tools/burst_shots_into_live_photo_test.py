@@ -1,6 +1,12 @@
+import os
+import tempfile
+import time
 import unittest
+from unittest import mock
 
 from ffmpeg_2pass_tools import burst_shots_into_live_photo
+from ffmpeg_2pass_tools import exiftool_utils
+from ffmpeg_2pass_tools import highlight
 from ffmpeg_2pass_tools import image_file
 
 
@@ -48,6 +54,17 @@ class BurstSeriesTest(unittest.TestCase):
     series = burst_shots_into_live_photo.BurstSeries.find_all_series(images, 1)
     self.assertEqual(len(series), 2)
 
+  def test_find_all_series__interleaved_patterns(self):
+    images = [
+        image_file.TestImageFile('DSC_001.jpg', 0.0),
+        image_file.TestImageFile('IMG_001.jpg', 0.0),
+        image_file.TestImageFile('DSC_002.jpg', 0.0),
+        image_file.TestImageFile('IMG_002.jpg', 0.0),
+    ]
+    series = burst_shots_into_live_photo.BurstSeries.find_all_series(images, 1)
+    self.assertEqual(len(series), 2)
+    self.assertEqual([len(s.images) for s in series], [2, 2])
+
   def test_find_all_series__min_number_of_images(self):
     images = [
         image_file.TestImageFile('DSC_001.jpg', 0.0),
@@ -57,6 +74,156 @@ class BurstSeriesTest(unittest.TestCase):
     series = burst_shots_into_live_photo.BurstSeries.find_all_series(images, 2)
     self.assertEqual(len(series), 1)
 
+  @mock.patch.object(exiftool_utils, 'get_times')
+  def test_find_all_series__fetches_times_of_consecutive_images_only(
+      self, get_times_func):
+    get_times_func.side_effect = lambda paths: [0.0] * len(paths)
+    images = [
+        image_file.ImageFile('IMG_001.jpg'),
+        image_file.ImageFile('IMG_003.jpg'),
+        image_file.ImageFile('IMG_004.jpg'),
+        image_file.ImageFile('IMG_006.jpg'),
+    ]
+    series = burst_shots_into_live_photo.BurstSeries.find_all_series(images, 1)
+    self.assertEqual(len(series), 3)
+    get_times_func.assert_called_once_with(['IMG_003.jpg', 'IMG_004.jpg'])
+
+
+class MakeVideosTest(unittest.TestCase):
+
+  def setUp(self):
+    self.series = [
+        burst_shots_into_live_photo.BurstSeries(
+            [image_file.TestImageFile(f'IMG_{i}01.jpg', 0.0)]) for i in range(6)
+    ]
+    self.made = []
+
+  def _make_video(self, series, ffmpeg_args, execcmd, passlogfile=None):
+    self.made.append((self.series.index(series), passlogfile))
+
+  @mock.patch('os.cpu_count', return_value=32)
+  def test_make_videos__dry_run_in_order(self, _):
+    with mock.patch.object(burst_shots_into_live_photo.BurstSeries,
+                           'make_video',
+                           autospec=True,
+                           side_effect=self._make_video):
+      burst_shots_into_live_photo.make_videos(
+          self.series, ['-c:v', 'libx264'], highlight.ExecCmd(dry_run=True))
+    # No -passlogfile, so the printed commands can be run as they are.
+    self.assertEqual(self.made, [(i, None) for i in range(6)])
+
+  @mock.patch('os.cpu_count', return_value=4)
+  def test_make_videos__sequential_stops_at_failure(self, _):
+
+    def make_video(series, *args):
+      self._make_video(series, *args)
+      if series is self.series[1]:
+        exit(1)
+
+    with mock.patch.object(burst_shots_into_live_photo.BurstSeries,
+                           'make_video',
+                           autospec=True,
+                           side_effect=make_video):
+      with self.assertRaises(SystemExit):
+        burst_shots_into_live_photo.make_videos(self.series, [],
+                                                highlight.ExecCmd())
+    self.assertEqual([i for i, _ in self.made], [0, 1])
+
+  @mock.patch('os.cpu_count', return_value=16)
+  def test_make_videos__parallel_stops_at_failure(self, _):
+
+    def make_video(series, *args):
+      self._make_video(series, *args)
+      if series is self.series[1]:
+        exit(1)
+      time.sleep(0.5 if series is self.series[0] else 0.1)
+
+    with mock.patch.object(burst_shots_into_live_photo.BurstSeries,
+                           'make_video',
+                           autospec=True,
+                           side_effect=make_video):
+      with self.assertRaises(SystemExit):
+        burst_shots_into_live_photo.make_videos(self.series, [],
+                                                highlight.ExecCmd())
+    # Series 0 and 1 start together. The failure of series 1 is noticed while
+    # series 0 is still running, and at most one more starts before the
+    # remaining ones are cancelled.
+    self.assertLessEqual(len(self.made), 3)
+    passlogfiles = [passlogfile for _, passlogfile in self.made]
+    self.assertNotIn(None, passlogfiles)
+    self.assertEqual(len(set(passlogfiles)), len(passlogfiles))
+
+
+class AttachVideosToStillsTest(unittest.TestCase):
+
+  @mock.patch.object(burst_shots_into_live_photo, 'attach_video_to_still')
+  @mock.patch.object(exiftool_utils, 'get_time')
+  def test_attach_videos_to_stills(self, get_time_func, attach_func):
+    series = burst_shots_into_live_photo.BurstSeries([
+        image_file.TestImageFile('IMG_001.jpg', 0.0),
+        image_file.TestImageFile('IMG_002.jpg', 0.0),
+    ])
+    stills = [
+        image_file.ImageFile('IMG_002-1.jpg'),
+        image_file.ImageFile('IMG_005.jpg'),
+    ]
+    burst_shots_into_live_photo.attach_videos_to_stills([series], stills)
+    attach_func.assert_called_once_with(series, stills[0], dry_run=False)
+    get_time_func.assert_not_called()
+
+
+class ScanForImageFilesTest(unittest.TestCase):
+
+  def test_scan_for_image_files__directory(self):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      for name in ['IMG_001.jpg', 'IMG_002.HEIC', 'notes.txt', 'jpg']:
+        open(os.path.join(tmp_dir, name), 'w').close()
+      os.mkdir(os.path.join(tmp_dir, 'folder.jpg'))
+      files = burst_shots_into_live_photo.scan_for_image_files([tmp_dir])
+      self.assertEqual(sorted(files), [
+          os.path.join(tmp_dir, 'IMG_001.jpg'),
+          os.path.join(tmp_dir, 'IMG_002.HEIC'),
+      ])
+
+  def test_scan_for_image_files__overlapping_paths(self):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      file1 = os.path.join(tmp_dir, 'IMG_001.jpg')
+      open(file1, 'w').close()
+      files = burst_shots_into_live_photo.scan_for_image_files(
+          [tmp_dir, file1, tmp_dir + '/'])
+      self.assertEqual(files, [file1])
+
+  def test_scan_for_image_files__file_before_directory(self):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      file1 = os.path.join(tmp_dir, 'IMG_001.jpg')
+      open(file1, 'w').close()
+      files = burst_shots_into_live_photo.scan_for_image_files(
+          [os.path.relpath(file1), tmp_dir])
+      self.assertEqual(files, [os.path.relpath(file1)])
+
+  def test_scan_for_image_files__subdirectory_with_image_ext(self):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      file1 = os.path.join(tmp_dir, 'a.jpg')
+      sub_dir = os.path.join(tmp_dir, 'burst.jpg')
+      file2 = os.path.join(sub_dir, 'IMG_001.jpg')
+      os.mkdir(sub_dir)
+      open(file1, 'w').close()
+      open(file2, 'w').close()
+      files = burst_shots_into_live_photo.scan_for_image_files(
+          [tmp_dir, sub_dir + '/'])
+      self.assertEqual(files, [file1, file2])
+
+  @mock.patch.object(highlight, 'warn')
+  def test_scan_for_image_files__missing_file_in_scanned_directory(
+      self, warn_func):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      missing = os.path.join(tmp_dir, 'typo.jpg')
+      files = burst_shots_into_live_photo.scan_for_image_files(
+          [tmp_dir, missing])
+      self.assertEqual(files, [])
+      warn_func.assert_called_once()
+      self.assertIn(missing, warn_func.call_args.args[0])
+
 
 if __name__ == '__main__':
   unittest.main()
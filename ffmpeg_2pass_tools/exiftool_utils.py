@@ -1,16 +1,89 @@
 import atexit
 import exiftool
+import functools
+import os
+import threading
+from typing import Sequence
 
-_exiftool_helper = exiftool.ExifToolHelper(common_args=[])
-atexit.register(_exiftool_helper.terminate)
+_lock = threading.Lock()
+"""Guards the `singleton()` helper, which is not thread-safe."""
 
+_time_cache: dict[tuple[str, float], float] = {}
+"""Cached results of `get_times`, keyed by (path, mtime)."""
 
+
+@functools.cache
 def singleton() -> exiftool.ExifToolHelper:
-  return _exiftool_helper
+  """Returns the shared helper. It's created, but not started, on first use.
+
+  The helper runs exiftool with `-stay_open` once started, and is terminated at
+  exit.
+  """
+  helper = exiftool.ExifToolHelper(common_args=[])
+  atexit.register(helper.terminate)
+  return helper
+
+
+def start() -> None:
+  """Starts the exiftool process ahead of its first use, if not running."""
+  with _lock:
+    if not singleton().running:
+      singleton().run()
+
+
+def execute(*params: str) -> str:
+  """Runs `singleton().execute` while holding the lock."""
+  with _lock:
+    return str(singleton().execute(*params))
 
 
 def get_time(fname: str) -> float:
-  result = singleton().execute(fname, '-dateFormat', '%s', '-printFormat',
-                               '$DateTimeOriginal.$SubSecTimeOriginal')
-  result = result.strip()
-  return float(result) if result else 0.0
+  return get_times([fname])[0]
+
+
+def get_times(fnames: Sequence[str]) -> list[float]:
+  """Gets the times of multiple files with a single exiftool execution.
+
+  Returns the times in seconds since the epoch, in the same order as `fnames`.
+  A file without time information gets 0.0.
+  """
+  keys = [_cache_key(f) for f in fnames]
+  missing = [f for f, k in zip(fnames, keys) if k not in _time_cache]
+  fetched = _fetch_times(missing) if missing else {}
+
+  times = []
+  for fname, key in zip(fnames, keys):
+    if key in _time_cache:
+      times.append(_time_cache[key])
+      continue
+    time = fetched.get(os.path.normpath(fname), 0.0)
+    if key[1] >= 0:
+      _time_cache[key] = time
+    times.append(time)
+  return times
+
+
+def _cache_key(fname: str) -> tuple[str, float]:
+  try:
+    return fname, os.path.getmtime(fname)
+  except OSError:
+    return fname, -1.0
+
+
+def _fetch_times(fnames: Sequence[str]) -> dict[str, float]:
+  """Runs exiftool once for all files. Returns a dict keyed by normpath."""
+  result = execute(
+      '-q', '-f', '-fast2', '-dateFormat', '%s', '-printFormat',
+      '$Directory/$FileName /// $DateTimeOriginal.$SubSecTimeOriginal',
+      *fnames)
+  times = {}
+  for line in str(result).strip().split('\n'):
+    parts = line.split(' /// ')
+    if len(parts) != 2:
+      continue
+    try:
+      time = float(parts[1])
+    except ValueError:
+      time = 0.0
+    times[os.path.normpath(parts[0])] = time
+  return times
@@ -0,0 +1,48 @@
+import exiftool
+import unittest
+from unittest import mock
+
+from ffmpeg_2pass_tools import exiftool_utils
+
+
+class GetTimesTest(unittest.TestCase):
+
+  def setUp(self):
+    exiftool_utils._time_cache.clear()
+
+  @mock.patch.object(exiftool.ExifToolHelper, 'execute')
+  def test_get_times(self, execute_func):
+    execute_func.return_value = ('./file1 /// 100.5\n'
+                                 'dir/file2 (1) /// 101\n'
+                                 'file3 /// -.-\n')
+    times = exiftool_utils.get_times(['file1', 'dir/file2 (1)', 'file3'])
+    self.assertEqual(times, [100.5, 101.0, 0.0])
+    execute_func.assert_called_once()
+
+  @mock.patch.object(exiftool.ExifToolHelper, 'execute')
+  def test_get_times__missing_file(self, execute_func):
+    execute_func.return_value = 'file1 /// 100\n'
+    times = exiftool_utils.get_times(['file1', 'file2'])
+    self.assertEqual(times, [100.0, 0.0])
+
+  @mock.patch.object(exiftool.ExifToolHelper, 'execute')
+  def test_get_times__no_files(self, execute_func):
+    self.assertEqual(exiftool_utils.get_times([]), [])
+    execute_func.assert_not_called()
+
+  @mock.patch.object(exiftool.ExifToolHelper, 'execute')
+  @mock.patch('os.path.getmtime', return_value=1.0)
+  def test_get_times__cached(self, _, execute_func):
+    execute_func.return_value = 'file1 /// 100\n'
+    self.assertEqual(exiftool_utils.get_times(['file1']), [100.0])
+    self.assertEqual(exiftool_utils.get_times(['file1']), [100.0])
+    execute_func.assert_called_once()
+
+  @mock.patch.object(exiftool.ExifToolHelper, 'execute')
+  def test_get_time(self, execute_func):
+    execute_func.return_value = 'file1 /// 100.25\n'
+    self.assertEqual(exiftool_utils.get_time('file1'), 100.25)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,17 +1,25 @@
 #!/usr/bin/env python3
 
 import dataclasses
-import glob
 import os
 import re
 import sys
-from typing import Iterable
+from typing import Callable, Iterable, NamedTuple
 
+from ffmpeg_2pass_tools import exiftool_utils
 from ffmpeg_2pass_tools import highlight
 
+# Pass 1 only analyzes the video stream and discards its output.
+_PASS1_MAP_ARGS = ('-map', '-0?', '-map', '0:v')
+_PASS1_OUTPUT_ARGS = ('-f', 'null', '/dev/null')
+_PASS1_X264_ARGS = (*_PASS1_MAP_ARGS, '-pass', '1', *_PASS1_OUTPUT_ARGS)
 
-@dataclasses.dataclass
-class PositionedArgument:
+_OUTPUT_EXTS = ('.mov', '.mp4')
+_CONCAT_LINE = re.compile(rb"file '(.+)'")
+_CONCAT_CHUNK_SIZE = 4096
+
+
+class PositionedArgument(NamedTuple):
   val: str
   pos: int
 
@@ -20,15 +28,30 @@ class CommandProcessor:
   """Processes the command line arguments for ffmpeg."""
   args: list[str]
 
+  _first_pos: dict[str, int]
+  """The first position of each argument, excluding the last argument."""
+
+  _last_pos: dict[str, int]
+  """The last position of each argument, excluding the last argument."""
+
   def __init__(self, args: Iterable[str] | None = None) -> None:
     self.args = list(args) if args else sys.argv[1:]
+    self._first_pos = {}
+    self._last_pos = {}
+    for i, arg in enumerate(self.args[:-1]):
+      self._first_pos.setdefault(arg, i)
+      self._last_pos[arg] = i
 
   def find_arg_position(self,
                         regex: str | re.Pattern,
                         backwards=False) -> int | None:
-    """Finds the position of an argument that matches a specific regex."""
+    """Finds the position of an argument that matches a specific regex.
+
+    A plain string is compared literally and looked up in an index of the
+    arguments, which is faster than scanning them with a regex.
+    """
     if isinstance(regex, str):
-      regex = re.compile(regex)
+      return (self._last_pos if backwards else self._first_pos).get(regex)
     rang = range(len(self.args) - 1)
     if backwards:
       rang = range(len(self.args) - 2, -1, -1)
@@ -75,10 +98,9 @@ class CommandProcessor:
     It works if the output ends with .mp4 or .mov; mistakes can occur if there
     is any side input video doesn't come with `-i`.
     """
-    regex = re.compile(r'\.(mov|mp4)$', re.IGNORECASE)
-    for i in range(len(self.args) - 1, -1, -1):
-      if regex.findall(self.args[i]):
-        return self.args[i] if self.args[i - 1] != '-i' else None
+    for i, arg in reversed(list(enumerate(self.args))):
+      if arg.lower().endswith(_OUTPUT_EXTS):
+        return arg if i == 0 or self.args[i - 1] != '-i' else None
     return None
 
   def find_one_input(self) -> str | None:
@@ -110,9 +132,24 @@ class CommandProcessor:
     If the input specification looks like a printf pattern with a `%`, for
     example `ABC%2d.jpg`, it will find the **last** file that matches
     `ABC??.jpg`, but not pass `-frames:v` frames (if specified).
+
+    The directory is listed once, instead of checking each file's existence.
+    A name missing from the listing is still checked with `os.path.exists`, as
+    the file system may be case-insensitive (e.g. on macOS).
     """
-    start_number = self._find_start_number(printf_pattern)
-    print('start_number: ', start_number)
+    dirname, name_pattern = os.path.split(printf_pattern)
+    try:
+      with os.scandir(dirname or '.') as entries:
+        existing_names = {e.name for e in entries}
+    except OSError:
+      return None
+
+    def exists(num: int) -> bool:
+      name = name_pattern % num
+      return (name in existing_names or
+              os.path.exists(os.path.join(dirname, name)))
+
+    start_number = self._find_start_number(exists)
     if start_number is None:
       return None
     max_frames = 1_000_000
@@ -120,32 +157,40 @@ class CommandProcessor:
       max_frames = int(arg.val)
     num = -1
     for num in range(start_number, start_number + max_frames):
-      path = printf_pattern % num
-      if not os.path.exists(path):
+      if not exists(num):
         num -= 1
         break
-    return printf_pattern % num
+    return os.path.join(dirname, name_pattern % num)
 
-  def _find_start_number(self, printf_pattern: str) -> int | None:
-    """Finds the start number for a printf pattern."""
+  def _find_start_number(self, exists: Callable[[int], bool]) -> int | None:
+    """Finds the start number for a printf pattern of file names."""
     attempts = [0, 1, 2, 3, 4]
     if arg := self.find_arg_after('-start_number'):
       attempts.insert(0, int(arg.val))
     for num in attempts:
-      path_attempt = printf_pattern % num
-      if os.path.exists(path_attempt):
+      if exists(num):
         return num
     return None
 
   @staticmethod
   def _find_one_input_from_concat(playlist_path: str) -> str | None:
-    """Finds the last video file in a playlist file."""
-    with open(playlist_path, 'rt') as f:
-      lines = f.readlines()
-    for i in range(len(lines) - 1, -1, -1):
-      matches = re.findall("file '(.+)'", lines[i])
-      if matches:
-        return matches[0]
+    """Finds the last video file in a playlist file.
+
+    The file is read backwards in chunks, so usually only its tail is read.
+    """
+    with open(playlist_path, 'rb') as f:
+      pos = f.seek(0, os.SEEK_END)
+      partial_line = b''
+      while pos > 0:
+        size = min(_CONCAT_CHUNK_SIZE, pos)
+        pos -= size
+        f.seek(pos)
+        lines = (f.read(size) + partial_line).split(b'\n')
+        # The first line may continue in the previous chunk.
+        partial_line = lines.pop(0) if pos > 0 else b''
+        for line in reversed(lines):
+          if matched := _CONCAT_LINE.search(line):
+            return os.fsdecode(matched.group(1))
     return None
 
 
@@ -161,7 +206,13 @@ class Result:
 
 
 def ffmpeg_2pass_and_exif(args: Iterable[str] | None = None,
-                          execcmd: highlight.ExecCmd | None = None) -> Result:
+                          execcmd: highlight.ExecCmd | None = None,
+                          passlogfile: str | None = None) -> Result:
+  """Runs the 2-pass encoding and copies the EXIF data to the output.
+
+  `passlogfile` is the prefix of the 2-pass log files. It must be unique
+  among encodes running at the same time. If not set, ffmpeg's default is used.
+  """
   execcmd = execcmd or highlight.ExecCmd()
   cp = CommandProcessor(args)
   one_input = cp.find_one_input()
@@ -204,22 +255,34 @@ def ffmpeg_2pass_and_exif(args: Iterable[str] | None = None,
   output_path += '.' + output_format
 
   # run the commands.
-  cmd = ['ffmpeg', '-nostdin', '-hide_banner'] + cp.args
+  cmd = ['ffmpeg', '-nostdin', '-hide_banner', *cp.args]
 
   if encoder == 'libx264':
-    execcmd.run(cmd + '-map -0? -map 0:v -pass 1 -f null /dev/null'.split(' '))
-    execcmd.run(cmd + ['-pass', '2', output_path])
+    if passlogfile:
+      cmd += ['-passlogfile', passlogfile]
+    execcmd.run([*cmd, *_PASS1_X264_ARGS])
+    pass2 = execcmd.run_async([*cmd, '-pass', '2', output_path])
   else:
     x265_params = cp.find_x265_params() or ''
-    execcmd.run(
-        cmd +
-        f'-map -0? -map 0:v -x265-params pass=1:{x265_params} -f null /dev/null'
-        .split(' '))
-    execcmd.run(cmd + ['-x265-params', f'pass=2:{x265_params}', output_path])
-
-  execcmd.run([
-      'exiftool', '-tagsFromFile', one_input, '-overwrite_original', output_path
-  ])
+    if passlogfile:
+      x265_params = f'stats={passlogfile}.log:{x265_params}'
+    execcmd.run([
+        *cmd, *_PASS1_MAP_ARGS, '-x265-params', f'pass=1:{x265_params}',
+        *_PASS1_OUTPUT_ARGS
+    ])
+    pass2 = execcmd.run_async(
+        [*cmd, '-x265-params', f'pass=2:{x265_params}', output_path])
+
+  # Start exiftool (and Perl) while pass 2 is encoding. Pass 2 is waited for
+  # even if that fails, so ffmpeg is not left running.
+  try:
+    if not execcmd.dry_run:
+      exiftool_utils.start()
+  finally:
+    execcmd.wait(pass2)
+
+  execcmd.run_exiftool(
+      ['-tagsFromFile', one_input, '-overwrite_original', output_path])
 
   return Result(bitrate=bitrate, encoder=encoder, output_path=output_path)
 
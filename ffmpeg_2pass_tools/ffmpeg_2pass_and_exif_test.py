@@ -0,0 +1,179 @@
+from parameterized import parameterized
+import os
+import re
+import tempfile
+import unittest
+from unittest import mock
+
+from ffmpeg_2pass_tools import exiftool_utils
+from ffmpeg_2pass_tools import ffmpeg_2pass_and_exif
+from ffmpeg_2pass_tools import highlight
+
+
+def _cp(cmdline: str) -> ffmpeg_2pass_and_exif.CommandProcessor:
+  return ffmpeg_2pass_and_exif.CommandProcessor(cmdline.split(' '))
+
+
+class CommandProcessorTest(unittest.TestCase):
+
+  def test_find_bitrate_and_encoder(self):
+    cp = _cp('-i in.mov -c:v libx264 -b:v 2M')
+    self.assertEqual(cp.find_bitrate(), '2M')
+    self.assertEqual(cp.find_encoder(), 'libx264')
+    self.assertIsNone(cp.find_x265_params())
+
+  def test_find_arg_after(self):
+    cp = _cp('-i a.mov -i b.mov')
+    self.assertEqual(cp.find_arg_after('-i'),
+                     ffmpeg_2pass_and_exif.PositionedArgument('a.mov', 1))
+    self.assertEqual(cp.find_arg_after('-i', backwards=True),
+                     ffmpeg_2pass_and_exif.PositionedArgument('b.mov', 3))
+    self.assertIsNone(cp.find_arg_after('-c:v'))
+
+  def test_find_arg_after__regex(self):
+    cp = _cp('-i a.mov -vcodec libx264')
+    self.assertEqual(cp.find_arg_after(re.compile(r'-c:v|-vcodec')),
+                     ffmpeg_2pass_and_exif.PositionedArgument('libx264', 3))
+    self.assertIsNone(cp.find_arg_after('-vc'))
+
+  def test_find_arg_after__last_arg_has_no_value(self):
+    self.assertIsNone(_cp('-i a.mov -b:v').find_arg_after('-b:v'))
+
+  @parameterized.expand([
+      ('AfterInput', '-f image2 -i in.jpg -f mov', 'mov'),
+      ('BeforeInputOnly', '-f image2 -i in.jpg', None),
+      ('NoInput', '-f mov', None),
+  ])
+  def test_find_output_format(self, _, cmdline: str, expected: str | None):
+    self.assertEqual(_cp(cmdline).find_output_format(), expected)
+
+  @parameterized.expand([
+      ('Mp4', '-i in.jpg out.mp4', 'out.mp4'),
+      ('UpperCaseMov', '-i in.jpg out.MOV', 'out.MOV'),
+      ('InputOnly', '-i in.mov -c:v libx264', None),
+      ('None', '-i in.jpg -c:v libx264', None),
+      ('FirstArg', 'out.mp4 -i', 'out.mp4'),
+  ])
+  def test_find_output(self, _, cmdline: str, expected: str | None):
+    self.assertEqual(_cp(cmdline).find_output(), expected)
+
+  def test_find_one_input__plain(self):
+    self.assertEqual(_cp('-i in.mov -c:v libx264').find_one_input(), 'in.mov')
+
+  @parameterized.expand([
+      ('AllFrames', '-f image2 -start_number 2 -i {}', 'IMG_004.jpg'),
+      ('StartNumberGuessed', '-f image2 -i {}', 'IMG_004.jpg'),
+      ('LimitedFrames', '-f image2 -start_number 2 -i {} -frames:v 2',
+       'IMG_003.jpg'),
+  ])
+  def test_find_one_input__image2(self, _, cmdline: str, expected: str):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      for num in [2, 3, 4, 6]:
+        open(os.path.join(tmp_dir, f'IMG_{num:03d}.jpg'), 'w').close()
+      cp = _cp(cmdline.format(os.path.join(tmp_dir, 'IMG_%03d.jpg')))
+      self.assertEqual(cp.find_one_input(), os.path.join(tmp_dir, expected))
+
+  def test_find_one_input__image2_case_insensitive(self):
+    real_exists = os.path.exists
+
+    def exists_ignoring_case(path: str) -> bool:
+      dirname, name = os.path.split(path)
+      return real_exists(os.path.join(dirname, name.lower()))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      for num in [1, 2]:
+        open(os.path.join(tmp_dir, f'img_{num:03d}.jpg'), 'w').close()
+      cp = _cp(f'-f image2 -i {os.path.join(tmp_dir, "IMG_%03d.jpg")}')
+      with mock.patch('os.path.exists', side_effect=exists_ignoring_case):
+        self.assertEqual(cp.find_one_input(),
+                         os.path.join(tmp_dir, 'IMG_002.jpg'))
+
+  def test_find_one_input__image2_not_found(self):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      pattern = os.path.join(tmp_dir, 'IMG_%03d.jpg')
+      self.assertEqual(_cp(f'-f image2 -i {pattern}').find_one_input(),
+                       pattern)
+
+  def test_find_one_input__concat(self):
+    with tempfile.NamedTemporaryFile(mode='wt', suffix='.txt') as tmp_file:
+      tmp_file.write("file 'a.jpg'\nduration 0.1\n"
+                     "file 'b.jpg'\nduration 0.1\n"
+                     "file 'c (1).jpg'\n\n")
+      tmp_file.flush()
+      cp = _cp(f'-f concat -safe 0 -i {tmp_file.name}')
+      self.assertEqual(cp.find_one_input(), 'c (1).jpg')
+
+  @mock.patch.object(ffmpeg_2pass_and_exif, '_CONCAT_CHUNK_SIZE', 5)
+  def test_find_one_input__concat_small_chunks(self):
+    self.test_find_one_input__concat()
+
+  def test_find_one_input__concat_no_file(self):
+    with tempfile.NamedTemporaryFile(mode='wt', suffix='.txt') as tmp_file:
+      tmp_file.write('duration 0.1\n')
+      tmp_file.flush()
+      cp = _cp(f'-f concat -safe 0 -i {tmp_file.name}')
+      self.assertEqual(cp.find_one_input(), tmp_file.name)
+
+
+class Ffmpeg2PassAndExifTest(unittest.TestCase):
+
+  def setUp(self):
+    self.execcmd = mock.create_autospec(highlight.ExecCmd, instance=True)
+    self.execcmd.dry_run = True
+
+  def _pass_commands(self) -> tuple[list[str], list[str]]:
+    return (self.execcmd.run.call_args.args[0],
+            self.execcmd.run_async.call_args.args[0])
+
+  def test_libx264_passlogfile(self):
+    ffmpeg_2pass_and_exif.ffmpeg_2pass_and_exif(
+        ['-i', 'in.mov', '-c:v', 'libx264'],
+        execcmd=self.execcmd,
+        passlogfile='/tmp/p')
+    base = [
+        'ffmpeg', '-nostdin', '-hide_banner', '-i', 'in.mov', '-c:v', 'libx264',
+        '-passlogfile', '/tmp/p'
+    ]
+    self.assertEqual(self._pass_commands(), (
+        [*base, '-map', '-0?', '-map', '0:v', '-pass', '1', '-f', 'null',
+         '/dev/null'],
+        [*base, '-pass', '2', 'in.x264.mp4'],
+    ))
+    self.execcmd.run_exiftool.assert_called_once_with(
+        ['-tagsFromFile', 'in.mov', '-overwrite_original', 'in.x264.mp4'])
+
+  def test_libx264_no_passlogfile(self):
+    ffmpeg_2pass_and_exif.ffmpeg_2pass_and_exif(
+        ['-i', 'in.mov', '-c:v', 'libx264'], execcmd=self.execcmd)
+    for cmd in self._pass_commands():
+      self.assertNotIn('-passlogfile', cmd)
+
+  def test_libx265_passlogfile(self):
+    ffmpeg_2pass_and_exif.ffmpeg_2pass_and_exif(
+        ['-i', 'in.mov', '-c:v', 'libx265', '-tag:v', 'hvc1',
+         '-x265-params', 'crf=20'],
+        execcmd=self.execcmd,
+        passlogfile='/tmp/p')
+    pass1, pass2 = self._pass_commands()
+    self.assertEqual(pass1[-6:], [
+        '0:v', '-x265-params', 'pass=1:stats=/tmp/p.log:crf=20', '-f', 'null',
+        '/dev/null'
+    ])
+    self.assertEqual(pass2[-3:], [
+        '-x265-params', 'pass=2:stats=/tmp/p.log:crf=20', 'in.x265.mp4'
+    ])
+
+
+  @mock.patch.object(exiftool_utils, 'start', side_effect=FileNotFoundError)
+  def test_waits_for_pass2_when_exiftool_fails_to_start(self, _):
+    self.execcmd.dry_run = False
+    with self.assertRaises(FileNotFoundError):
+      ffmpeg_2pass_and_exif.ffmpeg_2pass_and_exif(
+          ['-i', 'in.mov', '-c:v', 'libx264'], execcmd=self.execcmd)
+    self.execcmd.wait.assert_called_once_with(
+        self.execcmd.run_async.return_value)
+    self.execcmd.run_exiftool.assert_not_called()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 
+import bisect
 import dataclasses
 import enum
-import re
+import functools
+import os
 import sys
 import tempfile
 from typing import IO, Sequence
@@ -10,6 +12,14 @@ from typing import IO, Sequence
 from ffmpeg_2pass_tools import exiftool_utils
 from ffmpeg_2pass_tools import image_file
 
+# `guess_framerate` returns _FRAMERATES[i] for a rounded framerate `fr` that
+# _FRAMERATE_THRESHOLDS[i - 1] < fr <= _FRAMERATE_THRESHOLDS[i]; `None` means
+# `fr` itself. e.g. if 11 < fr <= 14, return 12.
+_FRAMERATE_THRESHOLDS = (1, 7, 9, 11, 14, 18, 23, 27, 45)
+_FRAMERATES = (1, None, 8, 10, 12, 15, 20, 25, 30, 60)
+
+_VIDEO_EXTS = ('.mp4', '.m4v', '.mov', '.avi', '.webm')
+
 
 class ColorSpace(enum.Enum):
   UNKNOWN = 0
@@ -33,10 +43,14 @@ class ColorSpace(enum.Enum):
       return []
 
   @classmethod
+  @functools.lru_cache(maxsize=64)
   def guess(cls, fname: str) -> 'ColorSpace':
+    # Without an ICC profile there is no profile description to look up.
+    if not _may_have_icc_profile(fname):
+      return cls.UNKNOWN
     try:
-      result = exiftool_utils.singleton().execute('-q', '-printFormat',
-                                                  '$ProfileDescription', fname)
+      result = exiftool_utils.execute('-q', '-printFormat',
+                                      '$ProfileDescription', fname)
       result = str(result)
       if 'sRGB' in result:
         return cls.SRGB
@@ -47,6 +61,61 @@ class ColorSpace(enum.Enum):
     return cls.UNKNOWN
 
 
+def _may_have_icc_profile(fname: str) -> bool:
+  """Peeks at the headers of a JPEG or PNG file for an ICC profile.
+
+  Returns False only when the file surely has no ICC profile. Other formats and
+  unreadable files return True.
+  """
+  ext = os.path.splitext(fname)[1].lower()
+  try:
+    with open(fname, 'rb') as f:
+      if ext in ('.jpg', '.jpeg'):
+        return _jpeg_may_have_icc_profile(f)
+      if ext == '.png':
+        return _png_may_have_icc_profile(f)
+  except OSError:
+    pass
+  return True
+
+
+def _jpeg_may_have_icc_profile(f: IO[bytes]) -> bool:
+  """Looks for an APP2 ICC_PROFILE segment before the image data."""
+  if f.read(2) != b'\xff\xd8':
+    return True
+  while True:
+    marker = f.read(4)
+    if len(marker) < 2 or marker[0] != 0xFF:
+      return True
+    if marker[1] in (0xDA, 0xD9):  # Start of scan, or end of image.
+      return False
+    if len(marker) < 4:
+      return True
+    length = int.from_bytes(marker[2:4], 'big') - 2
+    if marker[1] == 0xE2:
+      identifier = f.read(min(12, length))
+      if identifier == b'ICC_PROFILE\0':
+        return True
+      length -= len(identifier)
+    f.seek(length, os.SEEK_CUR)
+
+
+def _png_may_have_icc_profile(f: IO[bytes]) -> bool:
+  """Looks for an iCCP chunk before the image data."""
+  if f.read(8) != b'\x89PNG\r\n\x1a\n':
+    return True
+  while True:
+    header = f.read(8)
+    if len(header) < 8:
+      return True
+    chunk_type = header[4:]
+    if chunk_type == b'iCCP':
+      return True
+    if chunk_type in (b'IDAT', b'IEND'):
+      return False
+    f.seek(int.from_bytes(header[:4], 'big') + 4, os.SEEK_CUR)  # Data + CRC.
+
+
 class Image2Input:
   start: int
   num_frames: int
@@ -86,8 +155,7 @@ class Image2Input:
       return 10
 
     try:
-      time1 = exiftool_utils.get_time(files[0])
-      time2 = exiftool_utils.get_time(files[-1])
+      time1, time2 = exiftool_utils.get_times([files[0], files[-1]])
     except:
       return 10
     if time2 <= time1:
@@ -97,23 +165,8 @@ class Image2Input:
     # print(f'@@@ framerate:', fr)
     fr = round(fr)
 
-    mapping = [
-        [-1, 1],  # example: if -1 <= fr < 1, return 1
-        [1, fr],
-        [7, 8],
-        [9, 10],
-        [11, 12],  # example: if 11 <= fr < 14, return 12
-        [14, 15],
-        [18, 20],
-        [23, 25],
-        [27, 30],
-        [45, 30],
-    ]
-
-    for i in range(1, len(mapping)):
-      if fr <= mapping[i][0]:
-        return mapping[i - 1][1]
-    return 60
+    framerate = _FRAMERATES[bisect.bisect_left(_FRAMERATE_THRESHOLDS, fr)]
+    return fr if framerate is None else framerate
 
 
 class ConcatInput:
@@ -123,7 +176,7 @@ class ConcatInput:
   def __init__(self, files: Sequence[str]):
     self.playlist = []
 
-    exif_result = exiftool_utils.singleton().execute(
+    exif_result = exiftool_utils.execute(
         '-q', '-dateFormat', '%s', '-printFormat',
         '$FilePath /// $DateTimeOriginal.$SubSecTimeOriginal', *files)
 
@@ -152,14 +205,16 @@ class ConcatInput:
     return ['-f', 'concat', '-safe', '0', '-i', self._tmp_path]
 
   def _write_playlist(self, opened_file: IO[str]):
-    for path, duration in self.playlist:
-      opened_file.write(f"file '{path}'\n")
-      opened_file.write(f"duration {duration}\n")
-    opened_file.write(f"file '{self.playlist[-1][0]}'\n")
+    lines = [
+        "file '%s'\nduration %s\n" % (path, duration)
+        for path, duration in self.playlist
+    ]
+    lines.append("file '%s'\n" % self.playlist[-1][0])
+    opened_file.write(''.join(lines))
 
 
 def is_video(fname: str) -> bool:
-  return bool(re.search(r'\.(mp4|m4v|mov|avi|webm)$', fname, re.IGNORECASE))
+  return fname.lower().endswith(_VIDEO_EXTS)
 
 
 @dataclasses.dataclass
@@ -192,7 +247,7 @@ def main() -> int:
   flags = get_ffmpeg_input_flags(files).flags
   if not flags:
     return 2
-  print('\n'.join(flags))
+  sys.stdout.write('\n'.join(flags) + '\n')
   return 0
 
 
@@ -24,6 +24,73 @@ class TestConcatInput(get_ffmpeg_input_flags.ConcatInput):
     self.playlist = playlist
 
 
+def _jpeg(*segments: bytes) -> bytes:
+  return b'\xff\xd8' + b''.join(segments) + b'\xff\xda\x00\x02\xff\xd9'
+
+
+def _jpeg_segment(marker: int, data: bytes) -> bytes:
+  return bytes([0xFF, marker]) + (len(data) + 2).to_bytes(2, 'big') + data
+
+
+def _png(*chunk_types: bytes) -> bytes:
+  chunks = [(3).to_bytes(4, 'big') + t + b'abc' + b'crc!' for t in chunk_types]
+  return b'\x89PNG\r\n\x1a\n' + b''.join(chunks)
+
+
+class ColorSpaceTest(unittest.TestCase):
+
+  def setUp(self):
+    get_ffmpeg_input_flags.ColorSpace.guess.cache_clear()
+
+  @parameterized.expand([
+      ('JpegWithoutIcc', '.jpg',
+       _jpeg(_jpeg_segment(0xE1, b'Exif\0\0'),
+             _jpeg_segment(0xE2, b'MPF\0'))),
+      ('PngWithoutIcc', '.png', _png(b'IHDR', b'sRGB', b'IDAT', b'IEND')),
+  ])
+  @mock.patch.object(exiftool.ExifToolHelper, 'execute')
+  def test_guess__no_icc_profile(self, _, ext: str, content: bytes,
+                                 execute_func):
+    with tempfile.NamedTemporaryFile(suffix=ext) as tmp_file:
+      tmp_file.write(content)
+      tmp_file.flush()
+      self.assertEqual(get_ffmpeg_input_flags.ColorSpace.guess(tmp_file.name),
+                       get_ffmpeg_input_flags.ColorSpace.UNKNOWN)
+    execute_func.assert_not_called()
+
+  @parameterized.expand([
+      ('JpegWithIcc', '.jpg',
+       _jpeg(_jpeg_segment(0xE1, b'Exif\0\0'),
+             _jpeg_segment(0xE2, b'ICC_PROFILE\0\x01\x01data'))),
+      ('PngWithIcc', '.png', _png(b'IHDR', b'iCCP', b'IDAT', b'IEND')),
+      ('Heic', '.heic', b'whatever'),
+  ])
+  @mock.patch.object(exiftool.ExifToolHelper, 'execute')
+  def test_guess__may_have_icc_profile(self, _, ext: str, content: bytes,
+                                       execute_func):
+    execute_func.return_value = 'Display P3'
+    with tempfile.NamedTemporaryFile(suffix=ext) as tmp_file:
+      tmp_file.write(content)
+      tmp_file.flush()
+      self.assertEqual(get_ffmpeg_input_flags.ColorSpace.guess(tmp_file.name),
+                       get_ffmpeg_input_flags.ColorSpace.P3)
+      get_ffmpeg_input_flags.ColorSpace.guess(tmp_file.name)
+    execute_func.assert_called_once()
+
+
+class IsVideoTest(unittest.TestCase):
+
+  @parameterized.expand([
+      ('Mp4', 'a.mp4', True),
+      ('UpperCaseMov', 'dir/A.MOV', True),
+      ('Webm', 'a.webm', True),
+      ('Jpeg', 'a.jpg', False),
+      ('ExtensionInMiddle', 'a.mp4.jpg', False),
+  ])
+  def test_is_video(self, _, fname: str, expected: bool):
+    self.assertEqual(get_ffmpeg_input_flags.is_video(fname), expected)
+
+
 class Image2InputTest(unittest.TestCase):
 
   def test_flags(self):
@@ -43,10 +110,10 @@ class Image2InputTest(unittest.TestCase):
       ('Default 10 For One File', [100], 10),
       ('Default 10 For No File', [], 10),
   ])
-  @mock.patch.object(exiftool_utils, 'get_time')
+  @mock.patch.object(exiftool_utils, 'get_times')
   def test_guess_framerate(self, _, timestamps: Sequence[float],
-                           expected_framerate: float, get_time_func):
-    get_time_func.side_effect = lambda filepath: float(filepath)
+                           expected_framerate: float, get_times_func):
+    get_times_func.side_effect = lambda paths: [float(p) for p in paths]
     filenames = [str(ts) for ts in timestamps]
     self.assertEqual(
         get_ffmpeg_input_flags.Image2Input.guess_framerate(filenames),
@@ -1,6 +1,14 @@
 import builtins
+import exiftool
+import os
+import re
+import selectors
 import subprocess
-from typing import Sequence
+from typing import Callable, Sequence
+
+from ffmpeg_2pass_tools import exiftool_utils
+
+_LINE_END_RE = re.compile(rb'\r\n?|\n')
 
 
 def print(*args, **kwargs) -> None:
@@ -34,3 +42,81 @@ class ExecCmd:
       exit(130)
     if result.returncode != 0:
       exit(result.returncode)
+
+  def run_async(self, cmd: Sequence[str]) -> subprocess.Popen | None:
+    """Like `run`, but returns without waiting. Pass the result to `wait`."""
+    builtins.print()
+    print(*cmd)
+    if self.dry_run:
+      return None
+    return subprocess.Popen(cmd)
+
+  def wait(self, proc: subprocess.Popen | None) -> None:
+    """Waits for a command started by `run_async`. Exit if it failed."""
+    if proc is None:
+      return
+    try:
+      returncode = proc.wait()
+    except KeyboardInterrupt:
+      exit(130)
+    if returncode != 0:
+      exit(returncode)
+
+  def run_with_progress(self, cmd: Sequence[str],
+                        callback: Callable[[str], None]) -> None:
+    """Like `run`, but calls `callback` with each output line of the command.
+
+    Both stdout and stderr are read. Lines may end with either a newline or a
+    carriage return, which ffmpeg uses for its progress. The pipes are waited
+    on with a selector rather than polled in a busy loop, which would compete
+    with the command for CPU.
+    """
+    builtins.print()
+    print(*cmd)
+    if self.dry_run:
+      return
+    try:
+      with subprocess.Popen(cmd,
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE) as proc:
+        with selectors.DefaultSelector() as selector:
+          buffers: dict[int, bytes] = {}
+          for pipe in (proc.stdout, proc.stderr):
+            assert pipe
+            selector.register(pipe, selectors.EVENT_READ)
+            buffers[pipe.fileno()] = b''
+          while selector.get_map():
+            for key, _ in selector.select(timeout=0.2):
+              data = os.read(key.fd, 65536)
+              if not data:
+                selector.unregister(key.fileobj)
+                if buffers[key.fd]:
+                  callback(buffers[key.fd].decode(errors='replace'))
+                continue
+              *lines, buffers[key.fd] = _LINE_END_RE.split(buffers[key.fd] +
+                                                           data)
+              for line in lines:
+                if line:
+                  callback(line.decode(errors='replace'))
+        returncode = proc.wait()
+    except KeyboardInterrupt:
+      exit(130)
+    if returncode != 0:
+      exit(returncode)
+
+  def run_exiftool(self, args: Sequence[str]) -> None:
+    """Runs exiftool with `args` in the persistent `-stay_open` process.
+
+    This avoids starting a new exiftool (and Perl) process for each command.
+    """
+    builtins.print()
+    print('exiftool', *args)
+    if self.dry_run:
+      return
+    try:
+      exiftool_utils.execute(*args)
+    except exiftool.exceptions.ExifToolExecuteError as e:
+      warn(e.stderr.strip())
+      exit(e.returncode)
+    except KeyboardInterrupt:
+      exit(130)
@@ -0,0 +1,72 @@
+import exiftool
+import sys
+import unittest
+from unittest import mock
+
+from ffmpeg_2pass_tools import exiftool_utils
+from ffmpeg_2pass_tools import highlight
+
+
+class ExecCmdTest(unittest.TestCase):
+
+  def test_run_with_progress(self):
+    lines = []
+    highlight.ExecCmd().run_with_progress([
+        sys.executable, '-c',
+        'import sys; print("a"); sys.stderr.write("b\\rc\\r\\n"); print("d")'
+    ], lines.append)
+    self.assertEqual(sorted(lines), ['a', 'b', 'c', 'd'])
+
+  def test_run_with_progress__failure(self):
+    with self.assertRaises(SystemExit) as cm:
+      highlight.ExecCmd().run_with_progress(
+          [sys.executable, '-c', 'exit(3)'], lambda _: None)
+    self.assertEqual(cm.exception.code, 3)
+
+  def test_run_with_progress__dry_run(self):
+    lines = []
+    highlight.ExecCmd(dry_run=True).run_with_progress(['false'], lines.append)
+    self.assertEqual(lines, [])
+
+  def test_run_async(self):
+    execcmd = highlight.ExecCmd()
+    proc = execcmd.run_async([sys.executable, '-c', 'exit(0)'])
+    self.assertIsNotNone(proc)
+    execcmd.wait(proc)
+
+  def test_run_async__failure(self):
+    execcmd = highlight.ExecCmd()
+    proc = execcmd.run_async([sys.executable, '-c', 'exit(4)'])
+    with self.assertRaises(SystemExit) as cm:
+      execcmd.wait(proc)
+    self.assertEqual(cm.exception.code, 4)
+
+  def test_run_async__dry_run(self):
+    execcmd = highlight.ExecCmd(dry_run=True)
+    proc = execcmd.run_async(['false'])
+    self.assertIsNone(proc)
+    execcmd.wait(proc)
+
+  @mock.patch.object(exiftool_utils, 'execute')
+  def test_run_exiftool(self, execute_func):
+    highlight.ExecCmd().run_exiftool(['-ver'])
+    execute_func.assert_called_once_with('-ver')
+
+  @mock.patch.object(exiftool_utils, 'execute')
+  def test_run_exiftool__failure(self, execute_func):
+    execute_func.side_effect = exiftool.exceptions.ExifToolExecuteError(
+        2, '', 'Error: File not found\n', ['missing.jpg'])
+    with self.assertRaises(SystemExit) as cm:
+      highlight.ExecCmd().run_exiftool(['missing.jpg'])
+    self.assertEqual(cm.exception.code, 2)
+
+  @mock.patch.object(highlight, 'print')
+  @mock.patch.object(exiftool_utils, 'execute')
+  def test_run_exiftool__dry_run(self, execute_func, print_func):
+    highlight.ExecCmd(dry_run=True).run_exiftool(['-ver'])
+    print_func.assert_called_once_with('exiftool', '-ver')
+    execute_func.assert_not_called()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,14 +1,20 @@
+import functools
 import os
 import re
+from typing import Iterable
 
 from ffmpeg_2pass_tools import exiftool_utils
 
+_SEQ_RE = re.compile(r'(\d{3,})')
+
 
 class ImageFile:
+  __slots__ = ('path', '_time', 'sequence_num', 'path_pattern')
+
   path: str
   """The path to the image file."""
 
-  _time: float | None = None
+  _time: float | None
   """The time of the image file taken in seconds since the epoch."""
 
   sequence_num: int
@@ -27,30 +33,45 @@ class ImageFile:
   e.g. /path/to/456/IMG_123.jpg's path_pattern is /path/to/456/IMG_*.jpg.
   """
 
-  def __init__(self, path: str):
+  def __init__(self, path: str, time: float | None = None):
     self.path = path
+    self._time = time
     self.sequence_num, self.path_pattern = self.get_sequence_and_pattern(path)
 
   @property
   def time(self) -> float:
+    """The time of the image, fetched with exiftool on first access."""
     if self._time is None:
       self._time = exiftool_utils.get_time(self.path)
     return self._time
 
+  @staticmethod
+  def prefetch_times(images: Iterable['ImageFile']) -> None:
+    """Fetches the unknown times of `images` with a single exiftool run."""
+    images = [img for img in images if img._time is None]
+    if not images:
+      return
+    times = exiftool_utils.get_times([img.path for img in images])
+    for img, time in zip(images, times):
+      img._time = time
+
   @staticmethod
   def get_sequence_and_pattern(path: str) -> tuple[int, str]:
-    matched = re.search(r'(\d{3,})', os.path.basename(path))
-    if matched:
-      matched_str = matched.group(1)
-      number_format = f'%0{len(matched_str)}d'
-      return int(matched_str), os.path.join(
-          os.path.dirname(path),
-          os.path.basename(path).replace(matched_str, number_format))
-    return -1, path
+    return _get_sequence_and_pattern(path)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_sequence_and_pattern(path: str) -> tuple[int, str]:
+  basename = os.path.basename(path)
+  matched = _SEQ_RE.search(basename)
+  if matched:
+    start, end = matched.span(1)
+    pattern = f'{basename[:start]}%0{end - start}d{basename[end:]}'
+    return int(matched.group(1)), os.path.join(os.path.dirname(path), pattern)
+  return -1, path
 
 
 class TestImageFile(ImageFile):
 
   def __init__(self, path, time):
-    super().__init__(path)
-    self._time = time
+    super().__init__(path, time)
@@ -1,6 +1,8 @@
 from parameterized import parameterized
 import unittest
+from unittest import mock
 
+from ffmpeg_2pass_tools import exiftool_utils
 from ffmpeg_2pass_tools import image_file
 
 
@@ -11,6 +13,7 @@ class ImageFileTest(unittest.TestCase):
       ('4Digits', 'IMG_0002.jpg', 2, 'IMG_%04d.jpg'),
       ('TrailingDigit', 'IMG_002-1.jpg', 2, 'IMG_%03d-1.jpg'),
       ('WithFolder', 'folder_005/IMG_002.jpg', 2, 'folder_005/IMG_%03d.jpg'),
+      ('RepeatedDigits', 'IMG_123_123.jpg', 123, 'IMG_%03d_123.jpg'),
       ('NoSeqFor2Digits', 'IMG_01.jpg', -1, 'IMG_01.jpg'),
       ('NoSeqFor2Digits', 'folder_005/IMG_01.jpg', -1, 'folder_005/IMG_01.jpg'),
   ])
@@ -19,6 +22,14 @@ class ImageFileTest(unittest.TestCase):
     self.assertEqual(image_file.ImageFile.get_sequence_and_pattern(path),
                      (expected_seq_num, expected_path_pattern))
 
+  @mock.patch.object(exiftool_utils, 'get_time', return_value=123.0)
+  def test_time__fetched_once_on_demand(self, get_time_func):
+    image = image_file.ImageFile('IMG_001.jpg')
+    get_time_func.assert_not_called()
+    self.assertEqual(image.time, 123.0)
+    self.assertEqual(image.time, 123.0)
+    get_time_func.assert_called_once_with('IMG_001.jpg')
+
 
 if __name__ == '__main__':
   unittest.main()